@@ -1,21 +1,26 @@
-from typing import Final, Iterator, TypeAlias
-from collections import namedtuple
+from typing import Callable, ClassVar, Final, Iterator, TypeAlias
+from dataclasses import dataclass
+from functools import cache
 from argparse import Namespace, ArgumentParser
 from pathlib import Path
+from sys import intern
+from collections import Counter, defaultdict
 from typing_extensions import Self
 
 
 # CONSTANTS
 OUTPUT_FILE: Final[str] = "output.txt"
+OUTPUT_BUFFER_SIZE: Final[int] = 1 << 20
 
 # TYPE ALIAS
-Word = namedtuple("Word", ["word_index", "word_str"])
+# A pattern as a dict key - the pattern index and the words of the pattern string.
+PatternKey: TypeAlias = tuple[int, tuple[str, ...]]
 
 
 class Sentence:
 
     def __init__(self, words):
-        self.words: list[Word] = words
+        self.words: list[str] = words
 
     def __str__(self) -> str:
         """Return the sentence as a simple string."""
@@ -27,17 +32,17 @@ class Sentence:
 
     @classmethod
     def create(cls: Self, line: str) -> Self:
-        words = [Word(word_index, word_str) for word_index, word_str in enumerate(line.strip().split(" "))]
-        return cls(words)
+        # interned words compare by identity, so the pattern keys of equal words are compared without their content.
+        return cls([intern(word_str) for word_str in line.strip().split(" ")])
 
     @staticmethod
-    def get_words_string(words: list[Word]) -> str:
+    def get_words_string(words: list[str]) -> str:
         """
-        Converts list of Word type to a simple string.
+        Converts list of words to a simple string.
 
         :return: The sentence as a string.
         """
-        return ' '.join([word.word_str for word in words])
+        return ' '.join(words)
 
     @staticmethod
     def parse_to_sentences(lines: list[str]) -> list[Self]:
@@ -51,53 +56,80 @@ class Sentence:
         return sentences
 
     def get_word_str_by_index(self, index: int) -> str:
-        return self.words[index].word_str
-
-    def get_sub_sentence_words(self, start_index, end_index, pop_index=None) -> list[Word]:
-        pop_index = start_index if pop_index is None else pop_index
-        return self.words[start_index:pop_index] + self.words[pop_index + 1: end_index]
+        return self.words[index]
 
 
+@dataclass(frozen=True, slots=True)
 class Pattern:
+    """
+    A pattern of a sentence - the sentence without the word at the pattern index.
 
-    START_INDEX: Final[int] = 2
+    :param pattern_words: The words of the pattern.
+    :param pattern_index: The index of the differing word in the pattern.
+    """
 
-    def __init__(self, pattern_string, pattern_index):
-        """
-        Initialize a Pattern object with the given pattern string and index.
+    START_INDEX: ClassVar[int] = 2
+    MAX_SPECIALIZED_LENGTH: ClassVar[int] = 32
 
-        :param pattern_string: The string pattern.
-        :param pattern_index: The index of the differing word in the pattern.
+    pattern_words: tuple[str, ...]
+    pattern_index: int
+
+    @property
+    def pattern_string(self) -> str:
+        """The string pattern, joined on access."""
+        return Sentence.get_words_string(self.pattern_words)
+
+    @staticmethod
+    def get_key(sentence: Sentence, pattern_index: int) -> PatternKey:
+        """Return the pattern key by specified pattern index within the given sentence."""
+        words = sentence.words
+        return pattern_index, tuple(words[Pattern.START_INDEX:pattern_index] + words[pattern_index + 1:])
+
+    @classmethod
+    def from_key(cls: Self, key: PatternKey) -> Self:
+        """Return pattern instance from the given pattern key."""
+        pattern_index, pattern_words = key
+        return cls(pattern_words, pattern_index)
+
+    @staticmethod
+    def iter_pattern_keys(sentence: Sentence) -> Iterator[PatternKey]:
         """
-        self.pattern_string = pattern_string
-        self.pattern_index = pattern_index
+        Yields the sentence pattern keys for each pattern index, in order.
 
-    def __eq__(self, other):
+        :param sentence: The sentence to extract the patterns from.
+        :return: An iterator over the pattern keys of the sentence (see Pattern.get_key).
         """
-        Compare if two Pattern objects are equal based on their pattern string and index.
+        for pattern_index in range(Pattern.START_INDEX, len(sentence)):
+            yield Pattern.get_key(sentence, pattern_index)
 
-        :param other: The other Pattern object to compare.
-        :return: True if the two Pattern objects are equal, False otherwise.
+    @staticmethod
+    @cache
+    def get_pattern_keys_builder(sentence_length: int) -> Callable[[Sentence], Iterator[PatternKey]]:
         """
-        return (self.pattern_string == other.pattern_string) and (self.pattern_index == other.pattern_index)
+        Return a generator function that yields the pattern keys of a sentence with the given length.
 
-    def __hash__(self):
-        return hash((self.pattern_string, self.pattern_index))
+        The generator is generated for the length, so each pattern key is a tuple display of the words
+        at constant indexes, instead of slicing and concatenating the words for every pattern index (Pattern.get_key).
+        Like Pattern.iter_pattern_keys, the keys are yielded one at a time, so no key is built after a match.
+        Lengths above MAX_SPECIALIZED_LENGTH fall back to Pattern.iter_pattern_keys.
 
-    @classmethod
-    def create(cls: Self, sentence: Sentence, pattern_index: int) -> Self:
-        """return pattern instance by specified pattern index within the given sentence."""
-        pattern_string = Pattern.extract_pattern_string(sentence, pattern_index)
-        self = cls(pattern_string, pattern_index)
-        return self
+        :param sentence_length: The number of words of the sentences.
+        :return: A generator function that gets a sentence and yields its pattern keys, in pattern index order.
+        """
+        if sentence_length > Pattern.MAX_SPECIALIZED_LENGTH:
+            return Pattern.iter_pattern_keys
 
-    @staticmethod
-    def extract_pattern_string(sentence: Sentence, pattern_index: int) -> str:
-        """Extracts the pattern string by removing the word at the specified pattern index within the given sentence."""
-        pattern_words: list[Word] = sentence.get_sub_sentence_words(start_index=Pattern.START_INDEX,
-                                                                    end_index=len(sentence),
-                                                                    pop_index=pattern_index)
-        return Sentence.get_words_string(pattern_words)
+        pattern_indexes = range(Pattern.START_INDEX, sentence_length)
+        yield_pattern_keys = ''.join(
+            f"    yield {pattern_index}, ({''.join(f'words[{i}], ' for i in pattern_indexes if i != pattern_index)})\n"
+            for pattern_index in pattern_indexes)
+        source = (f"def iter_pattern_keys_{sentence_length}(sentence):\n"
+                  f"    words = sentence.words\n"
+                  f"{yield_pattern_keys}")
+
+        namespace: dict = {}
+        exec(compile(source, f"<pattern keys builder {sentence_length}>", "exec"), namespace)
+        return namespace[f"iter_pattern_keys_{sentence_length}"]
 
 
 class PatternCollection:
@@ -105,27 +137,15 @@ class PatternCollection:
     def __init__(self):
         """
         Initialize an instance that contains patterns and their associated sentences,
-        along with a set of pattern groups - patterns that have more than one associated sentence.
+        along with the pattern groups - patterns that have more than one associated sentence,
+        in the order they became groups.
         """
-        self._data: dict[Pattern, list[Sentence]] = dict()
-        self._pattern_groups: set[Pattern] = set()
-
-    def has_pattern(self, pattern) -> bool:
-        """Check if a pattern is already found."""
-        return pattern in self._data
-
-    def add_pattern(self, new_pattern: Pattern, pattern_sentence: Sentence) -> None:
-        """Add new pattern and initialize its associate sentence."""
-        self._data[new_pattern] = [pattern_sentence]
-
-    def update_pattern(self, pattern: Pattern, pattern_sentence: Sentence):
-        """Update a pattern with additional pattern sentence and define it as a pattern group."""
-        self._data[pattern].append(pattern_sentence)
-        self._pattern_groups.add(pattern)
+        self._data: dict[PatternKey, list[Sentence]] = dict()
+        self._pattern_groups: list[tuple[PatternKey, list[Sentence]]] = []
 
     def get_patterns_groups(self) -> Iterator[tuple[Pattern, list[Sentence]]]:
         """Get an iterator over the pattern groups, yielding each pattern and its associated sentences."""
-        return ((pattern, self._data[pattern]) for pattern in self._pattern_groups)
+        return ((Pattern.from_key(pattern), sentences) for pattern, sentences in self._pattern_groups)
 
     def extract_pattern_groups_output(self) -> Iterator[str]:
         """Extract from the pattern collection only the patterns that have a group of sentences."""
@@ -141,36 +161,71 @@ class PatternCollection:
         :param pattern_index: The index of the differing word in the pattern.
         :return: A paragraph containing the detailed pattern string.
         """
-        changing_word = ','.join([sentence.get_word_str_by_index(pattern_index) for sentence in sentences])
-        return '\n'.join([str(sentence) for sentence in sentences]) + \
-               f"\nThe changing word was: {changing_word}\r\n"
+        sentences_strings: list[str] = []
+        changing_words: list[str] = []
+        for sentence in sentences:
+            sentences_strings.append(str(sentence))
+            changing_words.append(sentence.get_word_str_by_index(pattern_index))
 
-    @staticmethod
-    def collect_patterns(sentences: list[Sentence]) -> Self:
+        changing_word = ','.join(changing_words)
+        return '\n'.join(sentences_strings) + f"\nThe changing word was: {changing_word}\r\n"
+
+    def add_sentences(self, sentences: list[Sentence]) -> None:
         """
-        Collects and extracts all the patterns that exist in the given sentences.
+        Add the patterns of the given sentences to the collection.
 
-        :param sentences: A list of sentences of the Sentence data type.
-        :return: A PatternCollection instance that holds:
-                 1. Each pattern and its associated sentences.
-                 2. Patterns that are defined as groups (having more than one associated sentence).
+        :param sentences: A list of sentences of the same length, longer than Pattern.START_INDEX.
         """
-        patterns_collection = PatternCollection()
+        # sentences of the same length can share a pattern with a pattern index above Pattern.START_INDEX
+        # only if they share the first word of their pattern string.
+        by_prefix: Counter[str] = Counter(sentence.words[Pattern.START_INDEX] for sentence in sentences)
+        build_pattern_keys = Pattern.get_pattern_keys_builder(len(sentences[0]))
+        data = self._data
         for sentence in sentences:
 
-            for pattern_index in range(Pattern.START_INDEX, len(sentence)):
-                pattern = Pattern.create(sentence, pattern_index)
-                if patterns_collection.has_pattern(pattern):
+            if by_prefix[sentence.words[Pattern.START_INDEX]] > 1:
+                pattern_keys = build_pattern_keys(sentence)
+            else:
+                # no other sentence shares the prefix, so only the first pattern index can be matched.
+                pattern_keys = (Pattern.get_key(sentence, Pattern.START_INDEX),)
 
-                    # update pattern with the additional sentence that found.
-                    patterns_collection.update_pattern(pattern, sentence)
-                    break
+            for pattern in pattern_keys:
+                pattern_sentences = data.get(pattern)
+                if pattern_sentences is None:
+                    # add new pattern to the patterns collection
+                    data[pattern] = [sentence]
 
                 else:
-                    # add new pattern to the patterns collection
-                    patterns_collection.add_pattern(pattern, sentence)
+                    # update pattern with the additional sentence that found, it becomes a group on its second sentence.
+                    if len(pattern_sentences) == 1:
+                        self._pattern_groups.append((pattern, pattern_sentences))
+                    pattern_sentences.append(sentence)
+                    break
 
-        return patterns_collection
+    @staticmethod
+    def bucket_sentences_by_length(sentences: list[Sentence]) -> dict[int, list[Sentence]]:
+        """Group the sentences by their length, keeping their original order within each group."""
+        buckets: defaultdict[int, list[Sentence]] = defaultdict(list)
+        for sentence in sentences:
+            buckets[len(sentence)].append(sentence)
+        return buckets
+
+    @staticmethod
+    def iter_pattern_groups_output(sentences: list[Sentence]) -> Iterator[str]:
+        """
+        Collects the patterns of the given sentences and yields the output of their pattern groups.
+
+        The pattern groups of a sentence length are complete once that length is collected, so the output
+        of each length is yielded right after it, and only one length's patterns are held in memory.
+
+        :param sentences: A list of sentences of the Sentence data type.
+        :return: An iterator over the paragraphs of the pattern groups.
+        """
+        for length, length_sentences in PatternCollection.bucket_sentences_by_length(sentences).items():
+            if length > Pattern.START_INDEX and len(length_sentences) > 1:
+                patterns_collection = PatternCollection()
+                patterns_collection.add_sentences(length_sentences)
+                yield from patterns_collection.extract_pattern_groups_output()
 
 
 def parse_args() -> Namespace:
@@ -184,16 +239,16 @@ def parse_args() -> Namespace:
 def read_file(fp: Path) -> list[str]:
     """"Read file. Return lines of file's content."""
     try:
-        with fp.open() as file:
-            return file.readlines()
+        # a single read, split on the newlines only (the text mode already translated them to '\n').
+        return fp.read_text().split('\n')
 
     except FileNotFoundError:
         raise ValueError(f"File not found: {fp}")
 
 
 def write_file(fp: Path, content: Iterator[str]) -> None:
-    """Write to output file."""
-    with open(fp, "w") as output_file:
+    """Write to output file, streaming the content through a large buffer to keep the write calls few."""
+    with open(fp, "w", buffering=OUTPUT_BUFFER_SIZE) as output_file:
         output_file.writelines(content)
 
 
@@ -213,8 +268,7 @@ def main():
         return
 
     sentences: list[Sentence] = Sentence.parse_to_sentences(lines)
-    patterns_collection: PatternCollection = PatternCollection.collect_patterns(sentences)
-    output: Iterator[str] = patterns_collection.extract_pattern_groups_output()
+    output: Iterator[str] = PatternCollection.iter_pattern_groups_output(sentences)
 
     # Write the program output
     write_file(output_fp, output)